@@ -1,16 +1,26 @@
 # app.py
 import os
+import json
 import uuid
+import atexit
+import secrets
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import accumulate, chain
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta, time, timezone
 from zoneinfo import ZoneInfo
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 
 from flask import (
     Flask, render_template, request, redirect, url_for, flash, jsonify
 )
 
-from sqlalchemy import create_engine, Column, String, DateTime
+from sqlalchemy import create_engine, make_url, select, update, bindparam, Column, String, DateTime, Index, event, text
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from email_validator import validate_email, EmailNotValidError
@@ -25,10 +35,50 @@ import settings  # expects BUSINESS_HOURS, SLOT_MINUTES, DAYS_AHEAD, LEAD_MINUTE
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET", "dev-secret")
 
-engine = create_engine(os.getenv("BOOKING_DB", "sqlite:///booking.db"),
-                       echo=False, future=True)
+DB_URL = os.getenv("BOOKING_DB", "sqlite:///booking.db")
+if make_url(DB_URL).get_backend_name() == "sqlite":
+    # SQLAlchemy already gives file-backed SQLite a thread-safe QueuePool.
+    # Writers queue on BEGIN IMMEDIATE, so give them a longer busy timeout.
+    _pool_kwargs = {"connect_args": {"check_same_thread": False, "timeout": 10}}
+else:
+    # Sizes are per process: with `gunicorn -w N`, keep N * (size + overflow)
+    # below the server's max_connections (roughly pool_size ~= 25 / N).
+    _pool_kwargs = {
+        "pool_size": int(os.getenv("BOOKING_DB_POOL_SIZE", "25")),
+        "max_overflow": int(os.getenv("BOOKING_DB_MAX_OVERFLOW", "25")),
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+engine = create_engine(DB_URL, echo=False, future=True, **_pool_kwargs)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        # take over BEGIN from pysqlite so _sqlite_begin can pick the mode
+        dbapi_conn.isolation_level = None
+        # WAL lets page renders read while a booking commits
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA mmap_size=268435456")
+        cur.execute("PRAGMA cache_size=-65536")
+        cur.close()
+
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin(conn):
+        # IMMEDIATE takes the write lock up front, so two check-then-write
+        # transactions can't both pass the overlap check
+        if conn.get_execution_options().get("sqlite_immediate"):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conn.exec_driver_sql("BEGIN")
+
 Base = declarative_base()
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+# For check-then-write paths (/book, /reschedule); serializes writers on SQLite
+WriteSessionLocal = sessionmaker(bind=engine.execution_options(sqlite_immediate=True),
+                                 expire_on_commit=False, future=True)
 
 
 class Booking(Base):
@@ -44,38 +94,122 @@ class Booking(Base):
     manage_token = Column(String, nullable=False, unique=True, default=lambda: str(uuid.uuid4()))
     created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
 
+    # manage_token is already indexed through its UNIQUE constraint
+    __table_args__ = (
+        # serves status = 'confirmed' AND start_utc < :end AND end_utc > :start
+        Index("ix_bookings_status_start_end", "status", "start_utc", "end_utc"),
+    )
+
 
 Base.metadata.create_all(engine)
+# create_all() skips indexes of tables that already exist
+for _ix in Booking.__table__.indexes:
+    _ix.create(engine, checkfirst=True)
+
+
+def _ensure_no_overlap_constraint() -> bool:
+    """
+    On Postgres, make the DB itself reject overlapping confirmed bookings, which
+    closes the check-then-insert race; added here rather than on create so
+    existing tables get it too. True only if the constraint is in place;
+    otherwise callers fall back to has_conflict().
+    """
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.begin() as conn:
+        if conn.execute(text(
+            "SELECT 1 FROM pg_constraint "
+            "WHERE conname = 'no_overlap' AND conrelid = 'bookings'::regclass"
+        )).first():
+            return True
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE bookings ADD CONSTRAINT no_overlap "
+                "EXCLUDE USING gist (tstzrange(start_utc, end_utc) WITH &&) "
+                "WHERE (status = 'confirmed')"
+            ))
+    except DBAPIError as e:  # e.g. existing overlaps or no ALTER privilege
+        print("[db] no_overlap constraint not added:", e)
+        return False
+    return True
+
+
+DB_ENFORCES_NO_OVERLAP = _ensure_no_overlap_constraint()
 
 
 # ------------------------------------------------------------------------------
 # Utilities
 # ------------------------------------------------------------------------------
 WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+_FALLBACK_TZ = ZoneInfo(settings.TIMEZONE)
+_UTC = timezone.utc
+_MIDNIGHT = time(0, 0)
+_ONE_DAY = timedelta(days=1)
 
 
+@lru_cache(maxsize=256)
 def safe_tz(tz_str: str | None) -> ZoneInfo:
-    """Resolve a ZoneInfo, falling back to settings.TIMEZONE."""
+    """Resolve a ZoneInfo, falling back to settings.TIMEZONE. Memoized."""
     try:
         return ZoneInfo(tz_str or settings.TIMEZONE)
     except Exception:
-        return ZoneInfo(settings.TIMEZONE)
+        return _FALLBACK_TZ
 
 
 def ensure_aware_utc(dt: datetime) -> datetime:
     """Normalize any datetime to tz-aware UTC."""
     if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc)
+        return dt.replace(tzinfo=_UTC)
+    return dt.astimezone(_UTC)
+
+
+# Prebuilt Core statements for the hot overlap queries; only bind values change
+# per call. `exclude` is "" when nothing is excluded (ids are never empty).
+_bookings = Booking.__table__
+_CONFLICT_STMT = (
+    select(_bookings.c.id)
+    .where(
+        _bookings.c.status == "confirmed",
+        _bookings.c.start_utc < bindparam("end"),
+        _bookings.c.end_utc > bindparam("start"),
+        _bookings.c.id != bindparam("exclude"),
+    )
+    .limit(1)
+    .with_for_update()  # no-op on SQLite, which locks via WriteSessionLocal
+)
+_WINDOW_STMT = select(_bookings.c.start_utc, _bookings.c.end_utc).where(
+    _bookings.c.status == "confirmed",
+    _bookings.c.start_utc < bindparam("end"),
+    _bookings.c.end_utc > bindparam("start"),
+)
+# Separate form so the public window query stays index-only (id isn't in the index)
+_WINDOW_EXCLUDING_STMT = _WINDOW_STMT.where(_bookings.c.id != bindparam("exclude"))
 
 
-def overlaps(a_start: datetime, a_end: datetime, b_start: datetime, b_end: datetime) -> bool:
-    """Safe overlap check (normalize all to UTC)."""
-    a_start = ensure_aware_utc(a_start)
-    a_end   = ensure_aware_utc(a_end)
-    b_start = ensure_aware_utc(b_start)
-    b_end   = ensure_aware_utc(b_end)
-    return a_start < b_end and a_end > b_start
+def has_conflict(session, start_utc: datetime, end_utc: datetime, exclude_booking_id: str | None = None) -> bool:
+    """True if any confirmed booking overlaps [start_utc, end_utc)."""
+    params = {"start": start_utc, "end": end_utc, "exclude": exclude_booking_id or ""}
+    return session.execute(_CONFLICT_STMT, params).first() is not None
+
+
+def get_by_token(session, token: str) -> Booking | None:
+    """Booking for a manage link; a single probe of the manage_token unique index."""
+    return session.execute(select(Booking).where(Booking.manage_token == token)).scalar_one_or_none()
+
+
+def bookings_in_window(
+    session,
+    start: datetime,
+    end: datetime,
+    exclude_booking_id: str | None = None,
+) -> List[Tuple[datetime, datetime]]:
+    """(start_utc, end_utc) of confirmed bookings intersecting [start, end)."""
+    params = {"start": start.astimezone(_UTC), "end": end.astimezone(_UTC)}
+    if exclude_booking_id:
+        params["exclude"] = exclude_booking_id
+        return session.execute(_WINDOW_EXCLUDING_STMT, params).all()
+    return session.execute(_WINDOW_STMT, params).all()
 
 
 def parse_range(r: str) -> tuple[time, time]:
@@ -94,29 +228,53 @@ def parse_range(r: str) -> tuple[time, time]:
     return start_t, end_t
 
 
+# Parsed BUSINESS_HOURS as (start, end) times, indexed by date.weekday() (0=Mon)
+BUSINESS_HOURS_BY_WEEKDAY = tuple(
+    tuple(parse_range(r) for r in settings.BUSINESS_HOURS.get(day, ())) for day in WEEKDAYS
+)
+
+
 def daterange(start_date: datetime, end_date: datetime):
     days = (end_date - start_date).days
     for i in range(days):
         yield (start_date + timedelta(days=i)).date()
 
 
-def generate_slots_for_date(d, tz: ZoneInfo, slot_minutes: int) -> List[Tuple[datetime, datetime]]:
+@lru_cache(maxsize=512)
+def _slot_template(weekday: int, slot_minutes: int) -> tuple[timedelta, ...]:
     """
-    For a date `d` (date object) and tz, build (start_local, end_local) slots
-    from BUSINESS_HOURS ranges like 'HH:MM-HH:MM'.
+    Slot start offsets from local midnight for `weekday` (0=Mon). Wall-clock
+    offsets don't depend on the date or tz, so this is computed once per weekday.
     """
-    ranges = settings.BUSINESS_HOURS.get(WEEKDAYS[d.weekday()], [])
-    step = timedelta(minutes=slot_minutes)
-    out: List[Tuple[datetime, datetime]] = []
+    out: List[timedelta] = []
 
-    for r in ranges:
-        t1, t2 = parse_range(r)
-        cur = datetime.combine(d, t1, tzinfo=tz)
-        end = datetime.combine(d, t2, tzinfo=tz)
-        while cur + step <= end + timedelta(minutes=1):  # +1m to allow 23:59 end
-            out.append((cur, cur + step))
-            cur += step
-    return out
+    for t1, t2 in BUSINESS_HOURS_BY_WEEKDAY[weekday]:
+        first = t1.hour * 60 + t1.minute
+        last = t2.hour * 60 + t2.minute + 1 - slot_minutes  # +1m to allow 23:59 end
+        out.extend(timedelta(minutes=m) for m in range(first, last + 1, slot_minutes))
+    return tuple(out)
+
+
+def generate_slots_for_date(
+    d, tz: ZoneInfo, slot_minutes: int, not_before: time | None = None,
+) -> Iterator[Tuple[datetime, datetime]]:
+    """
+    For a date `d` (date object) and tz, yield (start_local, end_local) slots
+    from BUSINESS_HOURS ranges like 'HH:MM-HH:MM', skipping any that start
+    before the local time `not_before`.
+    """
+    step = timedelta(minutes=slot_minutes)
+    # aware + timedelta is wall-clock arithmetic, same result as combine(d, t)
+    midnight = datetime.combine(d, _MIDNIGHT, tzinfo=tz)
+    skip = timedelta()
+    if not_before is not None:
+        skip = timedelta(hours=not_before.hour, minutes=not_before.minute,
+                         seconds=not_before.second, microseconds=not_before.microsecond)
+    for offset in _slot_template(d.weekday(), slot_minutes):
+        if offset < skip:
+            continue
+        start = midnight + offset
+        yield start, start + step
 
 
 def available_slots(
@@ -126,40 +284,155 @@ def available_slots(
     lead_minutes: int,
     tz_override: str | None = None,
     exclude_booking_id: str | None = None,
+    existing_bookings: List[Tuple[datetime, datetime]] | None = None,
+    now_utc: datetime | None = None,
 ) -> List[Tuple[datetime, datetime]]:
     """
     Compute available LOCAL slots across a window. Excludes slots that overlap
-    confirmed bookings in DB.
+    confirmed bookings in DB, or `existing_bookings` if the caller already
+    loaded them via bookings_in_window(). `now_utc` is the request's clock
+    reading; it defaults to the current time.
     """
     tz = safe_tz(tz_override)
-    now_local = datetime.now(tz) + timedelta(minutes=lead_minutes)
+    if now_utc is None:
+        now_utc = datetime.now(_UTC)
+    cutoff = now_utc.astimezone(tz) + timedelta(minutes=lead_minutes)
+    cutoff_date = cutoff.date()
     end_date_local = start_date_local + timedelta(days=days_ahead)
 
-    # Generate candidates
-    candidates: List[Tuple[datetime, datetime]] = []
-    for d in daterange(start_date_local, end_date_local):
-        candidates.extend(generate_slots_for_date(d, tz, slot_minutes))
+    # Days wholly before the lead-time cutoff can't offer anything
+    days = [d for d in daterange(start_date_local, end_date_local) if d >= cutoff_date]
 
-    # Enforce lead time
-    candidates = [(s, e) for (s, e) in candidates if s >= now_local]
+    # Closed every remaining day: nothing to offer, skip the DB
+    if not any(_slot_template(d.weekday(), slot_minutes) for d in days):
+        return []
 
-    # Overlap filter
-    with SessionLocal() as session:
-        q = session.query(Booking).filter(Booking.status == "confirmed")
-        if exclude_booking_id:
-            q = q.filter(Booking.id != exclude_booking_id)
-        existing = q.all()
+    step = timedelta(minutes=slot_minutes)
+
+    def day_candidates(d):
+        """(s_local, e_local, s_utc, e_utc) for each slot of `d` past the cutoff."""
+        midnight = datetime.combine(d, _MIDNIGHT, tzinfo=tz)
+        # No offset change between this midnight and the next: every slot is
+        # UTC midnight + its wall-clock offset, no per-slot astimezone()
+        fixed = midnight.utcoffset() == (midnight + _ONE_DAY).utcoffset()
+        utc_midnight = midnight.astimezone(_UTC)
+        # only the cutoff day straddles the boundary; later days are all clear
+        not_before = cutoff.time() if d == cutoff_date else None
+        for s, e in generate_slots_for_date(d, tz, slot_minutes, not_before):
+            if fixed:
+                s_utc = utc_midnight + (s - midnight)
+                yield s, e, s_utc, s_utc + step
+            else:
+                yield s, e, s.astimezone(_UTC), e.astimezone(_UTC)
+
+    # Generate candidates lazily
+    candidates = chain.from_iterable(day_candidates(d) for d in days)
+
+    # Overlap filter: only bookings that intersect the window
+    existing = existing_bookings
+    if existing is None:
+        with SessionLocal() as session:
+            existing = bookings_in_window(session, start_date_local, end_date_local, exclude_booking_id)
+
+    # Sort bookings by start once; reach[i] is the latest end among the first
+    # i+1 of them. A slot collides iff the bookings starting before it ends
+    # reach past its start -> one bisect per slot instead of a scan.
+    bounds = sorted((ensure_aware_utc(b_start), ensure_aware_utc(b_end)) for b_start, b_end in existing)
+    b_starts = [b_start for b_start, _ in bounds]
+    reach = list(accumulate((b_end for _, b_end in bounds), max))
 
     free: List[Tuple[datetime, datetime]] = []
-    for s_local, e_local in candidates:
-        s_utc = s_local.astimezone(timezone.utc)
-        e_utc = e_local.astimezone(timezone.utc)
-        if any(overlaps(s_utc, e_utc, b.start_utc, b.end_utc) for b in existing):
+    for s_local, e_local, s_utc, e_utc in candidates:
+        i = bisect_left(b_starts, e_utc)
+        if i and reach[i - 1] > s_utc:
             continue
         free.append((s_local, e_local))
     return free
 
 
+# Bumped on every booking write in this process; part of the slot cache key so
+# our own writes show up immediately. The minute in the key bounds staleness
+# from other workers' writes and keeps the lead-time cutoff current.
+_bookings_version = 0
+
+
+def bump_bookings_version() -> None:
+    global _bookings_version
+    _bookings_version += 1
+
+
+@lru_cache(maxsize=128)
+def _cached_slots(tz_str: str, start_iso: str, version: int, minute: int) -> Tuple[Tuple[datetime, datetime], ...]:
+    tz = safe_tz(tz_str)
+    start_date_local = datetime.strptime(start_iso, "%Y-%m-%d").date()
+    return tuple(available_slots(
+        datetime.combine(start_date_local, _MIDNIGHT, tzinfo=tz),
+        settings.DAYS_AHEAD,
+        settings.SLOT_MINUTES,
+        settings.LEAD_MINUTES,
+        tz_override=tz_str,
+    ))
+
+
+@lru_cache(maxsize=128)
+def _cached_slots_json(tz_str: str, start_iso: str, version: int, minute: int) -> str:
+    slots = _cached_slots(tz_str, start_iso, version, minute)
+    data = [{"start": s.isoformat(), "end": e.isoformat()} for s, e in slots]
+    # matches jsonify()'s non-debug body: sorted keys, compact, trailing newline
+    return json.dumps({"slots": data}, sort_keys=True, separators=(",", ":")) + "\n"
+
+
+def _slot_cache_key(tz_str: str, start_date_local, now_utc: datetime | None = None) -> Tuple[str, str, int, int]:
+    minute = int((now_utc or datetime.now(_UTC)).timestamp()) // 60
+    return tz_str, start_date_local.isoformat(), _bookings_version, minute
+
+
+def cached_available_slots(
+    tz_str: str, start_date_local, now_utc: datetime | None = None,
+) -> Tuple[Tuple[datetime, datetime], ...]:
+    """available_slots() for the public window, memoized per minute and write."""
+    return _cached_slots(*_slot_cache_key(tz_str, start_date_local, now_utc))
+
+
+def cached_available_slots_json(tz_str: str, start_date_local, now_utc: datetime | None = None) -> str:
+    """/api/slots body for the public window, serialized once per cache key."""
+    return _cached_slots_json(*_slot_cache_key(tz_str, start_date_local, now_utc))
+
+
+def _new_booking_ids() -> Tuple[str, str]:
+    """(id, manage_token) for a new booking from one 32-byte urandom draw."""
+    raw = secrets.token_bytes(32)
+    return str(uuid.UUID(bytes=raw[:16], version=4)), raw[16:].hex()
+
+
+@lru_cache(maxsize=4096)
+def _normalize_phone(raw: str) -> str | None:
+    """E.164 form of a (default US) phone number, or None if invalid. Memoized."""
+    try:
+        pn = phonenumbers.parse(raw, "US")
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(pn):  # implies is_possible_number
+        return None
+    return phonenumbers.format_number(pn, phonenumbers.PhoneNumberFormat.E164)
+
+
+@lru_cache(maxsize=4096)
+def _email_error(email: str) -> str | None:
+    """validate_email()'s complaint about `email`, or None if valid. Memoized."""
+    try:
+        validate_email(email, check_deliverability=False)
+    except EmailNotValidError as e:
+        return str(e)
+    return None
+
+
+def manage_url_for(token: str) -> str:
+    """Absolute manage link; PUBLIC_BASE_URL wins over the request's host."""
+    base = (os.getenv("PUBLIC_BASE_URL") or request.host_url).rstrip("/")
+    return f"{base}{url_for('manage', token=token)}"
+
+
 def fmt_local(dt_utc: datetime, tz_str: str) -> str:
     tz = safe_tz(tz_str)
     return ensure_aware_utc(dt_utc).astimezone(tz).strftime("%b %d, %Y %I:%M %p")
@@ -168,13 +441,42 @@ def fmt_local(dt_utc: datetime, tz_str: str) -> str:
 # ------------------------------------------------------------------------------
 # Notification helpers (best-effort; never crash app)
 # ------------------------------------------------------------------------------
+# Sends run off the request thread so responses don't wait on SendGrid/Twilio.
+_NOTIFY_EXEC = ThreadPoolExecutor(max_workers=8, thread_name_prefix="notify")
+atexit.register(_NOTIFY_EXEC.shutdown, wait=True)
+
+
+def _pooled_session() -> requests.Session:
+    """Keep-alive session that retries only sends the upstream never accepted."""
+    sess = requests.Session()
+    # POSTs aren't idempotent: retry connect failures and explicit
+    # "not processed" replies, never read timeouts or 5xx that may have sent
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=0,
+        backoff_factor=0.3,
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset({"POST"}),  # urllib3 skips POST by default
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    sess.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+    return sess
+
+
+# One pool per upstream so TLS handshakes are reused across notifications.
+_sg = _pooled_session()
+_tw = _pooled_session()
+
+
 def send_email(to_email: str, subject: str, html: str) -> None:
     try:
         key = os.getenv("SENDGRID_API_KEY")
         from_email = os.getenv("EMAIL_FROM")
         if not key or not from_email:
             return
-        r = requests.post(
+        r = _sg.post(
             "https://api.sendgrid.com/v3/mail/send",
             headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
             json={
@@ -202,8 +504,8 @@ def send_sms(to_phone: str, body: str) -> None:
         if not (sid and token and from_num):
             return
         url = f"https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
-        r = requests.post(url, data={"To": to_phone, "From": from_num, "Body": body},
-                          auth=(sid, token), timeout=20)
+        r = _tw.post(url, data={"To": to_phone, "From": from_num, "Body": body},
+                     auth=(sid, token), timeout=20)
         if r.status_code >= 400:
             print("[sms] error:", r.status_code, r.text)
     except Exception as e:
@@ -217,23 +519,18 @@ def send_sms(to_phone: str, body: str) -> None:
 def home():
     tz_str = request.args.get("tz") or settings.TIMEZONE
     tz = safe_tz(tz_str)
+    now_utc = datetime.now(_UTC)
     start_q = request.args.get("start")
 
     if start_q:
         try:
             start_date_local = datetime.strptime(start_q, "%Y-%m-%d").date()
         except ValueError:
-            start_date_local = datetime.now(tz).date()
+            start_date_local = now_utc.astimezone(tz).date()
     else:
-        start_date_local = datetime.now(tz).date()
+        start_date_local = now_utc.astimezone(tz).date()
 
-    slots = available_slots(
-        datetime.combine(start_date_local, datetime.min.time(), tzinfo=tz),
-        settings.DAYS_AHEAD,
-        settings.SLOT_MINUTES,
-        settings.LEAD_MINUTES,
-        tz_override=tz_str,
-    )
+    slots = cached_available_slots(tz_str, start_date_local, now_utc)
 
     # Template should iterate like: {% for s,e in slots %} ...
     return render_template(
@@ -250,25 +547,17 @@ def api_slots():
     """JSON version for clients. Returns a dict (not a raw list)."""
     tz_str = request.args.get("tz") or settings.TIMEZONE
     tz = safe_tz(tz_str)
+    now_utc = datetime.now(_UTC)
     start_q = request.args.get("start")
     if start_q:
         try:
             start_date_local = datetime.strptime(start_q, "%Y-%m-%d").date()
         except ValueError:
-            start_date_local = datetime.now(tz).date()
+            start_date_local = now_utc.astimezone(tz).date()
     else:
-        start_date_local = datetime.now(tz).date()
+        start_date_local = now_utc.astimezone(tz).date()
 
-    slots = available_slots(
-        datetime.combine(start_date_local, datetime.min.time(), tzinfo=tz),
-        settings.DAYS_AHEAD,
-        settings.SLOT_MINUTES,
-        settings.LEAD_MINUTES,
-        tz_override=tz_str,
-    )
-    # serialize to strings
-    data = [{"start": s.isoformat(), "end": e.isoformat()} for s, e in slots]
-    return jsonify({"slots": data})
+    return app.response_class(cached_available_slots_json(tz_str, start_date_local, now_utc), mimetype="application/json")
 
 
 @app.post("/book")
@@ -285,18 +574,13 @@ def book_post():
         flash("Name, email, phone and a time slot are required.", "error")
         return redirect(url_for("home"))
 
-    try:
-        validate_email(email, check_deliverability=False)
-    except EmailNotValidError as e:
-        flash(f"Email looks invalid: {str(e)}", "error")
+    email_error = _email_error(email)
+    if email_error:
+        flash(f"Email looks invalid: {email_error}", "error")
         return redirect(url_for("home"))
 
-    try:
-        pn = phonenumbers.parse(phone_raw, "US")
-        if not phonenumbers.is_possible_number(pn) or not phonenumbers.is_valid_number(pn):
-            raise ValueError()
-        phone_e164 = phonenumbers.format_number(pn, phonenumbers.PhoneNumberFormat.E164)
-    except Exception:
+    phone_e164 = _normalize_phone(phone_raw)
+    if not phone_e164:
         flash("Please enter a valid US phone number (e.g., 3125550123).", "error")
         return redirect(url_for("home"))
 
@@ -311,39 +595,49 @@ def book_post():
         flash("Invalid slot time.", "error")
         return redirect(url_for("home"))
 
-    start_utc = start_local.astimezone(timezone.utc)
-    end_utc = end_local.astimezone(timezone.utc)
+    start_utc = start_local.astimezone(_UTC)
+    end_utc = end_local.astimezone(_UTC)
 
-    with SessionLocal() as session:
+    with WriteSessionLocal() as session:
         # block overlaps
-        existing = session.query(Booking).filter(Booking.status == "confirmed").all()
-        if any(overlaps(start_utc, end_utc, b.start_utc, b.end_utc) for b in existing):
+        if not DB_ENFORCES_NO_OVERLAP and has_conflict(session, start_utc, end_utc):
             flash("That time overlaps an existing booking.", "error")
             return redirect(url_for("home"))
 
+        booking_id, manage_token = _new_booking_ids()
         b = Booking(
+            id=booking_id,
             name=name,
             email=email,
             phone=phone_e164,
             start_utc=start_utc,
             end_utc=end_utc,
             status="confirmed",
-            manage_token=str(uuid.uuid4()),
+            manage_token=manage_token,
         )
         session.add(b)
-        session.commit()
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            flash("That time overlaps an existing booking.", "error")
+            return redirect(url_for("home"))
+        bump_bookings_version()
 
         # notifications (best-effort)
-        base = (os.getenv("PUBLIC_BASE_URL") or "").rstrip("/")
-        manage_url = f"{base}{url_for('manage', token=b.manage_token)}" if base else url_for("manage", token=b.manage_token, _external=True)
+        manage_url = manage_url_for(b.manage_token)
         subj = "Your 60-minute session is booked ✅"
-        html = (
-            f"<p>Hi {b.name},</p>"
-            f"<p><b>When:</b> {fmt_local(b.start_utc, tz_str)} – {fmt_local(b.end_utc, tz_str)} ({tz_str})</p>"
-            f'<p><a href="{manage_url}">Manage / reschedule / cancel</a></p>'
+        when_start = fmt_local(b.start_utc, tz_str)
+        html = render_template(
+            "email/booked.html",
+            booking=b,
+            start=when_start,
+            end=fmt_local(b.end_utc, tz_str),
+            timezone=tz_str,
+            manage_url=manage_url,
         )
-        send_email(b.email, subj, html)
-        send_sms(b.phone, f"Confirmed: {fmt_local(b.start_utc, tz_str)} ({tz_str}). Manage: {manage_url}")
+        _NOTIFY_EXEC.submit(send_email, b.email, subj, html)
+        _NOTIFY_EXEC.submit(send_sms, b.phone, f"Confirmed: {when_start} ({tz_str}). Manage: {manage_url}")
 
     flash("Booked! Check your email/text for details.", "success")
     return redirect(url_for("home"))
@@ -353,7 +647,7 @@ def book_post():
 def manage(token):
     tz_str = request.args.get("tz") or settings.TIMEZONE
     with SessionLocal() as session:
-        b = session.query(Booking).filter_by(manage_token=token).first()
+        b = get_by_token(session, token)
         if not b:
             flash("Manage link not found.", "error")
             return redirect(url_for("home"))
@@ -364,21 +658,29 @@ def manage(token):
 def reschedule(token):
     tz_str = request.args.get("tz") or settings.TIMEZONE
     tz = safe_tz(tz_str)
+    now_utc = datetime.now(_UTC)
+
+    start_date_local = now_utc.astimezone(tz).date()
+    window_start = datetime.combine(start_date_local, _MIDNIGHT, tzinfo=tz)
 
+    # One session for the booking and the conflicts we filter slots against
     with SessionLocal() as session:
-        b = session.query(Booking).filter_by(manage_token=token).first()
+        b = get_by_token(session, token)
         if not b:
             flash("Manage link not found.", "error")
             return redirect(url_for("home"))
+        existing = bookings_in_window(
+            session, window_start, window_start + timedelta(days=settings.DAYS_AHEAD), exclude_booking_id=b.id,
+        )
 
-    start_date_local = datetime.now(tz).date()
     slots = available_slots(
-        datetime.combine(start_date_local, datetime.min.time(), tzinfo=tz),
+        window_start,
         settings.DAYS_AHEAD,
         settings.SLOT_MINUTES,
         settings.LEAD_MINUTES,
         tz_override=tz_str,
-        exclude_booking_id=b.id,
+        existing_bookings=existing,
+        now_utc=now_utc,
     )
 
     return render_template(
@@ -409,34 +711,42 @@ def reschedule_post(token):
         flash("Invalid slot time.", "error")
         return redirect(url_for("manage", token=token))
 
-    start_utc = start_local.astimezone(timezone.utc)
-    end_utc = end_local.astimezone(timezone.utc)
+    start_utc = start_local.astimezone(_UTC)
+    end_utc = end_local.astimezone(_UTC)
 
-    with SessionLocal() as session:
-        b = session.query(Booking).filter_by(manage_token=token).first()
+    with WriteSessionLocal() as session:
+        b = get_by_token(session, token)
         if not b:
             flash("Manage link not found.", "error")
             return redirect(url_for("home"))
 
-        others = session.query(Booking).filter(Booking.id != b.id, Booking.status == "confirmed").all()
-        if any(overlaps(start_utc, end_utc, x.start_utc, x.end_utc) for x in others):
+        if not DB_ENFORCES_NO_OVERLAP and has_conflict(session, start_utc, end_utc, exclude_booking_id=b.id):
             flash("That time overlaps another booking.", "error")
             return redirect(url_for("manage", token=token))
 
         b.start_utc = start_utc
         b.end_utc = end_utc
-        session.commit()
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            flash("That time overlaps another booking.", "error")
+            return redirect(url_for("manage", token=token))
+        bump_bookings_version()
 
-        base = (os.getenv("PUBLIC_BASE_URL") or "").rstrip("/")
-        manage_url = f"{base}{url_for('manage', token=b.manage_token)}" if base else url_for("manage", token=b.manage_token, _external=True)
+        manage_url = manage_url_for(b.manage_token)
         subj = "Your session was rescheduled 🔁"
-        html = (
-            f"<p>Hi {b.name},</p>"
-            f"<p><b>New time:</b> {fmt_local(b.start_utc, tz_str)} – {fmt_local(b.end_utc, tz_str)} ({tz_str})</p>"
-            f'<p><a href="{manage_url}">Manage / cancel</a></p>'
+        when_start = fmt_local(b.start_utc, tz_str)
+        html = render_template(
+            "email/rescheduled.html",
+            booking=b,
+            start=when_start,
+            end=fmt_local(b.end_utc, tz_str),
+            timezone=tz_str,
+            manage_url=manage_url,
         )
-        send_email(b.email, subj, html)
-        send_sms(b.phone, f"Rescheduled: {fmt_local(b.start_utc, tz_str)} ({tz_str}). Manage: {manage_url}")
+        _NOTIFY_EXEC.submit(send_email, b.email, subj, html)
+        _NOTIFY_EXEC.submit(send_sms, b.phone, f"Rescheduled: {when_start} ({tz_str}). Manage: {manage_url}")
 
     flash("Rescheduled.", "success")
     return redirect(url_for("manage", token=token))
@@ -444,13 +754,16 @@ def reschedule_post(token):
 
 @app.post("/cancel/<token>")
 def cancel(token):
-    with SessionLocal() as session:
-        b = session.query(Booking).filter_by(manage_token=token).first()
-        if not b:
+    # One UPDATE by the unique token; rowcount tells us whether it existed
+    with WriteSessionLocal() as session:
+        result = session.execute(
+            update(_bookings).where(_bookings.c.manage_token == token).values(status="canceled")
+        )
+        if not result.rowcount:
             flash("Manage link not found.", "error")
             return redirect(url_for("home"))
-        b.status = "canceled"
         session.commit()
+        bump_bookings_version()
     flash("Canceled.", "success")
     return redirect(url_for("home"))
 
@@ -479,5 +792,5 @@ def handle_error(e):
 # Local dev
 # ------------------------------------------------------------------------------
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    app.run(host="0.0.0.0", port=int(os.getenv("PORT", "5000")), debug=True)
 